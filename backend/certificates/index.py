@@ -5,16 +5,380 @@ Args: event - dict с httpMethod, body, queryStringParameters
 Returns: HTTP response dict с данными сертификатов
 '''
 
+import base64
+import fcntl
+import gzip
 import json
+import mmap
 import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
 from typing import Dict, Any, List, Optional
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
 
-def get_db_connection():
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CERT_COLUMNS = 'id, owner_name, certificate_url, status, valid_from, valid_until, created_at'
+COMPRESS_MIN_BYTES = 1024
+
+# owner_name_norm (V0006) = lower(translate(owner_name, 'Ёё', 'Ее')); normalize_owner_query должна ему соответствовать
+SEARCH_MIN_LENGTH = 3
+SEARCH_CANDIDATES = 200
+SEARCH_FUZZY_MIN_LENGTH = 6
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+REPLICA_CONNECT_TIMEOUT = 3
+REPLICA_RETRY_COOLDOWN = 30
+
+_replica_state: Dict[str, float] = {'down_until': 0.0}
+
+def get_db_connection(readonly: bool = False):
     database_url = os.environ.get('DATABASE_URL')
+    read_url = os.environ.get('DATABASE_READ_URL')
+    
+    # Чтение идет на реплику, если она настроена; при ее недоступности - на основную БД.
+    # После неудачного подключения реплика пропускается REPLICA_RETRY_COOLDOWN секунд, чтобы не ждать таймаут на каждом запросе
+    if readonly and read_url and time.time() >= _replica_state['down_until']:
+        try:
+            return psycopg2.connect(read_url, cursor_factory=RealDictCursor, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+        except psycopg2.OperationalError:
+            _replica_state['down_until'] = time.time() + REPLICA_RETRY_COOLDOWN
     return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
 
+def get_tuple_cursor(conn):
+    # Строки приходят кортежами в порядке CERT_COLUMNS, без построения dict на стороне драйвера
+    return conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+
+def normalize_owner_query(query: str) -> str:
+    return query.strip().lower().replace('ё', 'е')
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_by_owner_name(cur, query: str, limit: int) -> List[tuple]:
+    # Ступени по убыванию точности; следующая выполняется, только если предыдущие не набрали limit:
+    # 1) имя начинается с запроса (btree), 2) подстрока (GIN pg_trgm) с ранжированием среди первых SEARCH_CANDIDATES совпадений,
+    # 3) нечеткое совпадение по словам (<%) - только если ничего не найдено: оно дороже и на коротких запросах не укладывается в миллисекунды
+    normalized = normalize_owner_query(query)
+    pattern = escape_like(normalized)
+    cur.execute(
+        f'SELECT {CERT_COLUMNS} FROM certificates WHERE owner_name_norm COLLATE "C" LIKE %s '
+        'ORDER BY owner_name_norm COLLATE "C", id LIMIT %s',
+        (f'{pattern}%', limit)
+    )
+    rows = cur.fetchall()
+    
+    if len(rows) < limit:
+        cur.execute(
+            f"SELECT {CERT_COLUMNS} FROM ("
+            f"SELECT {CERT_COLUMNS}, owner_name_norm FROM certificates "
+            f"WHERE owner_name_norm LIKE %s AND owner_name_norm NOT LIKE %s LIMIT %s"
+            f") AS candidates ORDER BY word_similarity(%s, owner_name_norm) DESC, owner_name, id LIMIT %s",
+            (f'%{pattern}%', f'{pattern}%', SEARCH_CANDIDATES, normalized, limit - len(rows))
+        )
+        rows += cur.fetchall()
+    
+    if not rows and len(normalized) >= SEARCH_FUZZY_MIN_LENGTH:
+        cur.execute(
+            f"SELECT {CERT_COLUMNS} FROM certificates WHERE %s <%% owner_name_norm "
+            f"ORDER BY word_similarity(%s, owner_name_norm) DESC, owner_name, id LIMIT %s",
+            (normalized, normalized, limit)
+        )
+        rows = cur.fetchall()
+    return rows
+
+def serialize_certificate(row: tuple) -> Dict[str, Any]:
+    valid_from, valid_until, created_at = row[4], row[5], row[6]
+    return {
+        'id': row[0],
+        'owner_name': row[1],
+        'certificate_url': row[2],
+        'status': row[3],
+        'valid_from': valid_from.isoformat() if valid_from is not None else None,
+        'valid_until': valid_until.isoformat() if valid_until is not None else None,
+        'created_at': created_at.isoformat(' ') if created_at is not None else None
+    }
+
+def serialize_certificates(rows: List[tuple]) -> List[Dict[str, Any]]:
+    return [serialize_certificate(row) for row in rows]
+
+def dump_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def choose_encoding(request_headers: Dict[str, Any]) -> Optional[str]:
+    accept = request_headers.get('Accept-Encoding') or request_headers.get('accept-encoding') or ''
+    accepted = set()
+    for part in accept.split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def json_response(status_code: int, payload: Any, headers: Dict[str, str], request_headers: Dict[str, Any]) -> Dict[str, Any]:
+    body = dump_json(payload)
+    
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = choose_encoding(request_headers)
+        if encoding:
+            if encoding == 'br':
+                compressed = brotli.compress(body, quality=4)
+            else:
+                compressed = gzip.compress(body, compresslevel=5)
+            return {
+                'statusCode': status_code,
+                'headers': {**headers, 'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'},
+                'body': base64.b64encode(compressed).decode('ascii'),
+                'isBase64Encoded': True
+            }
+    
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': body.decode('utf-8'),
+        'isBase64Encoded': False
+    }
+
+# Снимок таблицы certificates для проверки ID без обращения к БД.
+# Формат: заголовок, отсортированная по ID таблица смещений фиксированной ширины, упакованные записи.
+# Каждый экземпляр функции собирает снимок сам в фоновом потоке; в заголовке хранится версия certificates_version (V0005, V0007)
+SNAPSHOT_PATH = os.environ.get('CERT_SNAPSHOT_PATH', '/tmp/certificates.snapshot')
+SNAPSHOT_MAX_AGE = int(os.environ.get('CERT_SNAPSHOT_MAX_AGE', '3600'))
+SNAPSHOT_VERSION_TTL = int(os.environ.get('CERT_SNAPSHOT_VERSION_TTL', '5'))
+SNAPSHOT_OUTAGE_MAX_AGE = int(os.environ.get('CERT_SNAPSHOT_OUTAGE_MAX_AGE', '21600'))
+SNAPSHOT_REBUILD_INTERVAL = 60
+SNAPSHOT_MAGIC = b'CERTSNP2'
+SNAPSHOT_HEADER = struct.Struct('<8sIdq')
+SNAPSHOT_OFFSET = struct.Struct('<I')
+SNAPSHOT_RECORD = struct.Struct('<IIIIiiq')
+SNAPSHOT_EPOCH = datetime(1970, 1, 1)
+SNAPSHOT_NULL_TIMESTAMP = -2 ** 63
+
+_snapshot_cache: Dict[str, Any] = {}
+_snapshot_build_state: Dict[str, Any] = {'running': False, 'started_at': 0.0}
+
+def fetch_data_version(cur) -> int:
+    cur.execute("SELECT COALESCE(sum(version), 0)::bigint FROM certificates_version")
+    return cur.fetchone()[0]
+
+def read_snapshot_header() -> Optional[tuple]:
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as f:
+            magic, count, built_at, version = SNAPSHOT_HEADER.unpack(f.read(SNAPSHOT_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return (count, built_at, version) if magic == SNAPSHOT_MAGIC else None
+
+def build_snapshot(requested_at: float) -> None:
+    # При общем CERT_SNAPSHOT_PATH файл собирает один экземпляр; остальные пропускают сборку, если он уже обновлен
+    with open(f'{SNAPSHOT_PATH}.lock', 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        header = read_snapshot_header()
+        if header and header[1] >= requested_at:
+            return
+        write_snapshot()
+
+def write_snapshot() -> None:
+    # Версия и строки читаются в одной транзакции и соответствуют друг другу. Снимок с реплики, отстающей от записи,
+    # получит меньшую версию и будет отклонен проверкой версии по основной БД
+    conn = get_db_connection(readonly=True)
+    conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+    cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    version = fetch_data_version(cur)
+    cur.execute(f"SELECT {CERT_COLUMNS} FROM certificates")
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    
+    # Сортировка по байтам UTF-8, чтобы порядок совпадал с бинарным поиском и не зависел от collation БД
+    records = sorted(((row[0].encode('utf-8'), row) for row in rows), key=lambda item: item[0])
+    offsets = bytearray()
+    data = bytearray()
+    base = SNAPSHOT_HEADER.size + SNAPSHOT_OFFSET.size * len(records)
+    
+    for id_bytes, row in records:
+        owner_name = row[1].encode('utf-8')
+        certificate_url = row[2].encode('utf-8')
+        status = (row[3] or '').encode('utf-8')
+        valid_from = row[4].toordinal() if row[4] is not None else 0
+        valid_until = row[5].toordinal() if row[5] is not None else 0
+        created_at = (row[6] - SNAPSHOT_EPOCH) // timedelta(microseconds=1) if row[6] is not None else SNAPSHOT_NULL_TIMESTAMP
+        
+        offsets += SNAPSHOT_OFFSET.pack(base + len(data))
+        data += SNAPSHOT_RECORD.pack(len(id_bytes), len(owner_name), len(certificate_url), len(status), valid_from, valid_until, created_at)
+        data += id_bytes + owner_name + certificate_url + status
+    
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(SNAPSHOT_PATH) or '.', prefix='.certificates-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(records), time.time(), version))
+            f.write(offsets)
+            f.write(data)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def run_snapshot_build(requested_at: float) -> None:
+    try:
+        build_snapshot(requested_at)
+    except Exception:
+        # Следующая попытка - не раньше чем через SNAPSHOT_REBUILD_INTERVAL; до тех пор поиск идет в БД
+        pass
+    finally:
+        _snapshot_build_state['running'] = False
+
+def schedule_snapshot_build() -> None:
+    # Полное чтение таблицы идет в фоновом потоке, а не в пользовательском запросе
+    now = time.time()
+    if _snapshot_build_state['running'] or now - _snapshot_build_state['started_at'] < SNAPSHOT_REBUILD_INTERVAL:
+        return
+    _snapshot_build_state['running'] = True
+    _snapshot_build_state['started_at'] = now
+    threading.Thread(target=run_snapshot_build, args=(now,), daemon=True).start()
+
+def open_snapshot() -> Optional[Dict[str, Any]]:
+    try:
+        stat = os.stat(SNAPSHOT_PATH)
+    except OSError:
+        return None
+    
+    cached = _snapshot_cache.get('snapshot')
+    if cached and cached['ino'] == stat.st_ino and cached['mtime_ns'] == stat.st_mtime_ns:
+        return cached
+    
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, built_at, version = SNAPSHOT_HEADER.unpack_from(mm, 0)
+    except (OSError, ValueError, struct.error):
+        return None
+    
+    if magic != SNAPSHOT_MAGIC:
+        mm.close()
+        return None
+    
+    if cached:
+        cached['mm'].close()
+    snapshot = {
+        'mm': mm, 'count': count, 'built_at': built_at, 'version': version,
+        'checked_at': 0.0, 'outdated': False, 'ino': stat.st_ino, 'mtime_ns': stat.st_mtime_ns
+    }
+    _snapshot_cache['snapshot'] = snapshot
+    return snapshot
+
+def snapshot_lookup(snapshot: Dict[str, Any], cert_id: str) -> Optional[tuple]:
+    mm = snapshot['mm']
+    key = cert_id.encode('utf-8')
+    lo, hi = 0, snapshot['count']
+    
+    while lo < hi:
+        mid = (lo + hi) // 2
+        offset = SNAPSHOT_OFFSET.unpack_from(mm, SNAPSHOT_HEADER.size + mid * SNAPSHOT_OFFSET.size)[0]
+        id_len, owner_len, url_len, status_len, valid_from, valid_until, created_at = SNAPSHOT_RECORD.unpack_from(mm, offset)
+        start = offset + SNAPSHOT_RECORD.size
+        current = mm[start:start + id_len]
+        
+        if current < key:
+            lo = mid + 1
+        elif current > key:
+            hi = mid
+        else:
+            start += id_len
+            owner_name = mm[start:start + owner_len].decode('utf-8')
+            start += owner_len
+            certificate_url = mm[start:start + url_len].decode('utf-8')
+            start += url_len
+            status = mm[start:start + status_len].decode('utf-8') or None
+            return (
+                cert_id,
+                owner_name,
+                certificate_url,
+                status,
+                date.fromordinal(valid_from) if valid_from else None,
+                date.fromordinal(valid_until) if valid_until else None,
+                SNAPSHOT_EPOCH + timedelta(microseconds=created_at) if created_at != SNAPSHOT_NULL_TIMESTAMP else None
+            )
+    return None
+
+def fetch_certificate_row(cert_id: str) -> Optional[tuple]:
+    conn = get_db_connection(readonly=True)
+    cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    cur.execute(f"SELECT {CERT_COLUMNS} FROM certificates WHERE id = %s", (cert_id,))
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    return row
+
+def snapshot_is_current(snapshot: Dict[str, Any]) -> bool:
+    now = time.time()
+    if now - snapshot['built_at'] > SNAPSHOT_MAX_AGE:
+        return False
+    
+    # Версия данных проверяется не чаще раза в SNAPSHOT_VERSION_TTL секунд: отзыв или удаление
+    # сертификата видны в ответах не позже чем через этот интервал. Сверяем с основной БД, чтобы не зависеть от отставания реплики
+    if not snapshot['outdated'] and now - snapshot['checked_at'] > SNAPSHOT_VERSION_TTL:
+        try:
+            conn = get_db_connection()
+            try:
+                version = fetch_data_version(conn.cursor(cursor_factory=psycopg2.extensions.cursor))
+            finally:
+                conn.close()
+        except psycopg2.OperationalError:
+            return False
+        snapshot['checked_at'] = now
+        snapshot['outdated'] = version > snapshot['version']
+    return not snapshot['outdated']
+
+def lookup_certificate_row(cert_id: str) -> Optional[tuple]:
+    snapshot = open_snapshot() if SNAPSHOT_MAX_AGE > 0 else None
+    if snapshot is not None and snapshot_is_current(snapshot):
+        row = snapshot_lookup(snapshot, cert_id)
+        if row:
+            return row
+    elif SNAPSHOT_MAX_AGE > 0:
+        schedule_snapshot_build()
+    
+    # Промах по снимку (ID мог появиться после сборки) или снимок неактуален
+    try:
+        return fetch_certificate_row(cert_id)
+    except psycopg2.OperationalError:
+        # БД недоступна: отвечаем по снимку, если он не старше SNAPSHOT_OUTAGE_MAX_AGE
+        if snapshot is not None and time.time() - snapshot['built_at'] <= SNAPSHOT_OUTAGE_MAX_AGE:
+            row = snapshot_lookup(snapshot, cert_id)
+            if row:
+                return row
+        raise
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
@@ -38,29 +402,52 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
     
     # GET /certificates?id=CERT-XXX - поиск по ID
+    # GET /certificates?q=Петрова&limit=20 - поиск по имени владельца
     if method == 'GET':
         params = event.get('queryStringParameters') or {}
         cert_id = params.get('id', '').strip()
+        query = params.get('q', '').strip()
+        request_headers = event.get('headers') or {}
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        if cert_id:
-            cur.execute("SELECT id, owner_name, certificate_url, status, valid_from, valid_until, created_at FROM certificates WHERE id = %s", (cert_id,))
-            cert = cur.fetchone()
+        if not cert_id and query:
+            if len(query) < SEARCH_MIN_LENGTH:
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({'error': f'Запрос должен содержать не менее {SEARCH_MIN_LENGTH} символов'}),
+                    'isBase64Encoded': False
+                }
+            
+            try:
+                limit = int(params.get('limit', SEARCH_DEFAULT_LIMIT))
+            except ValueError:
+                limit = SEARCH_DEFAULT_LIMIT
+            limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+            
+            conn = get_db_connection(readonly=True)
+            cur = get_tuple_cursor(conn)
+            certs = search_by_owner_name(cur, query, limit)
             cur.close()
             conn.close()
             
-            if cert:
+            return json_response(200, {'certificates': serialize_certificates(certs)}, headers, request_headers)
+        
+        if cert_id:
+            try:
+                cert = lookup_certificate_row(cert_id)
+            except psycopg2.OperationalError:
                 return {
-                    'statusCode': 200,
+                    'statusCode': 503,
                     'headers': headers,
-                    'body': json.dumps({
-                        'found': True,
-                        'certificate': dict(cert)
-                    }, default=str),
+                    'body': json.dumps({'found': None, 'message': 'Сервис проверки временно недоступен'}),
                     'isBase64Encoded': False
                 }
+            
+            if cert:
+                return json_response(200, {
+                    'found': True,
+                    'certificate': serialize_certificate(cert)
+                }, headers, request_headers)
             else:
                 return {
                     'statusCode': 404,
@@ -70,17 +457,14 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
         else:
             # Получить все сертификаты
-            cur.execute("SELECT id, owner_name, certificate_url, status, valid_from, valid_until, created_at FROM certificates ORDER BY created_at DESC")
+            conn = get_db_connection(readonly=True)
+            cur = get_tuple_cursor(conn)
+            cur.execute(f"SELECT {CERT_COLUMNS} FROM certificates ORDER BY created_at DESC")
             certs = cur.fetchall()
             cur.close()
             conn.close()
             
-            return {
-                'statusCode': 200,
-                'headers': headers,
-                'body': json.dumps({'certificates': [dict(c) for c in certs]}, default=str),
-                'isBase64Encoded': False
-            }
+            return json_response(200, {'certificates': serialize_certificates(certs)}, headers, request_headers)
     
     # POST /certificates - добавить новый сертификат
     if method == 'POST':
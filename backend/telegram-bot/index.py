@@ -5,10 +5,19 @@ Args: event - dict с httpMethod, body от Telegram webhook
 Returns: HTTP response для Telegram API
 '''
 
+import fcntl
+import html
 import json
+import mmap
 import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
 from typing import Dict, Any, Optional, List
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
 import urllib.request
 import urllib.parse
@@ -17,8 +26,31 @@ TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
 TELEGRAM_API_URL = f'https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}'
 ADMIN_USERNAME = 'skzry'
 
-def get_db_connection():
+CERT_COLUMNS = 'id, owner_name, certificate_url, status, valid_from, valid_until, created_at'
+CERT_KEYS = ('id', 'owner_name', 'certificate_url', 'status', 'valid_from', 'valid_until', 'created_at')
+
+# owner_name_norm (V0006) = lower(translate(owner_name, 'Ёё', 'Ее')); normalize_owner_query должна ему соответствовать
+SEARCH_MIN_LENGTH = 3
+SEARCH_CANDIDATES = 200
+SEARCH_FUZZY_MIN_LENGTH = 6
+SEARCH_LIMIT = 10
+
+REPLICA_CONNECT_TIMEOUT = 3
+REPLICA_RETRY_COOLDOWN = 30
+
+_replica_state: Dict[str, float] = {'down_until': 0.0}
+
+def get_db_connection(readonly: bool = False):
     database_url = os.environ.get('DATABASE_URL')
+    read_url = os.environ.get('DATABASE_READ_URL')
+    
+    # Чтение идет на реплику, если она настроена; при ее недоступности - на основную БД.
+    # После неудачного подключения реплика пропускается REPLICA_RETRY_COOLDOWN секунд, чтобы не ждать таймаут на каждом запросе
+    if readonly and read_url and time.time() >= _replica_state['down_until']:
+        try:
+            return psycopg2.connect(read_url, cursor_factory=RealDictCursor, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+        except psycopg2.OperationalError:
+            _replica_state['down_until'] = time.time() + REPLICA_RETRY_COOLDOWN
     return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
 
 def send_telegram_message(chat_id: int, text: str, parse_mode: str = 'HTML', reply_markup: Optional[Dict] = None):
@@ -91,7 +123,225 @@ def edit_message_text(chat_id: int, message_id: int, text: str, parse_mode: str
     except:
         return {'ok': False}
 
-def search_certificate(cert_id: str) -> Optional[Dict[str, Any]]:
+# Снимок таблицы certificates для проверки ID без обращения к БД.
+# Формат: заголовок, отсортированная по ID таблица смещений фиксированной ширины, упакованные записи.
+# Каждый экземпляр функции собирает снимок сам в фоновом потоке; в заголовке хранится версия certificates_version (V0005, V0007)
+SNAPSHOT_PATH = os.environ.get('CERT_SNAPSHOT_PATH', '/tmp/certificates.snapshot')
+SNAPSHOT_MAX_AGE = int(os.environ.get('CERT_SNAPSHOT_MAX_AGE', '3600'))
+SNAPSHOT_VERSION_TTL = int(os.environ.get('CERT_SNAPSHOT_VERSION_TTL', '5'))
+SNAPSHOT_OUTAGE_MAX_AGE = int(os.environ.get('CERT_SNAPSHOT_OUTAGE_MAX_AGE', '21600'))
+SNAPSHOT_REBUILD_INTERVAL = 60
+SNAPSHOT_MAGIC = b'CERTSNP2'
+SNAPSHOT_HEADER = struct.Struct('<8sIdq')
+SNAPSHOT_OFFSET = struct.Struct('<I')
+SNAPSHOT_RECORD = struct.Struct('<IIIIiiq')
+SNAPSHOT_EPOCH = datetime(1970, 1, 1)
+SNAPSHOT_NULL_TIMESTAMP = -2 ** 63
+
+_snapshot_cache: Dict[str, Any] = {}
+_snapshot_build_state: Dict[str, Any] = {'running': False, 'started_at': 0.0}
+
+def fetch_data_version(cur) -> int:
+    cur.execute("SELECT COALESCE(sum(version), 0)::bigint FROM certificates_version")
+    return cur.fetchone()[0]
+
+def read_snapshot_header() -> Optional[tuple]:
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as f:
+            magic, count, built_at, version = SNAPSHOT_HEADER.unpack(f.read(SNAPSHOT_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return (count, built_at, version) if magic == SNAPSHOT_MAGIC else None
+
+def build_snapshot(requested_at: float) -> None:
+    # При общем CERT_SNAPSHOT_PATH файл собирает один экземпляр; остальные пропускают сборку, если он уже обновлен
+    with open(f'{SNAPSHOT_PATH}.lock', 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        header = read_snapshot_header()
+        if header and header[1] >= requested_at:
+            return
+        write_snapshot()
+
+def write_snapshot() -> None:
+    # Версия и строки читаются в одной транзакции и соответствуют друг другу. Снимок с реплики, отстающей от записи,
+    # получит меньшую версию и будет отклонен проверкой версии по основной БД
+    conn = get_db_connection(readonly=True)
+    conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+    cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    version = fetch_data_version(cur)
+    cur.execute(f"SELECT {CERT_COLUMNS} FROM certificates")
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    
+    # Сортировка по байтам UTF-8, чтобы порядок совпадал с бинарным поиском и не зависел от collation БД
+    records = sorted(((row[0].encode('utf-8'), row) for row in rows), key=lambda item: item[0])
+    offsets = bytearray()
+    data = bytearray()
+    base = SNAPSHOT_HEADER.size + SNAPSHOT_OFFSET.size * len(records)
+    
+    for id_bytes, row in records:
+        owner_name = row[1].encode('utf-8')
+        certificate_url = row[2].encode('utf-8')
+        status = (row[3] or '').encode('utf-8')
+        valid_from = row[4].toordinal() if row[4] is not None else 0
+        valid_until = row[5].toordinal() if row[5] is not None else 0
+        created_at = (row[6] - SNAPSHOT_EPOCH) // timedelta(microseconds=1) if row[6] is not None else SNAPSHOT_NULL_TIMESTAMP
+        
+        offsets += SNAPSHOT_OFFSET.pack(base + len(data))
+        data += SNAPSHOT_RECORD.pack(len(id_bytes), len(owner_name), len(certificate_url), len(status), valid_from, valid_until, created_at)
+        data += id_bytes + owner_name + certificate_url + status
+    
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(SNAPSHOT_PATH) or '.', prefix='.certificates-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(records), time.time(), version))
+            f.write(offsets)
+            f.write(data)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def run_snapshot_build(requested_at: float) -> None:
+    try:
+        build_snapshot(requested_at)
+    except Exception:
+        # Следующая попытка - не раньше чем через SNAPSHOT_REBUILD_INTERVAL; до тех пор поиск идет в БД
+        pass
+    finally:
+        _snapshot_build_state['running'] = False
+
+def schedule_snapshot_build() -> None:
+    # Полное чтение таблицы идет в фоновом потоке, а не в пользовательском запросе
+    now = time.time()
+    if _snapshot_build_state['running'] or now - _snapshot_build_state['started_at'] < SNAPSHOT_REBUILD_INTERVAL:
+        return
+    _snapshot_build_state['running'] = True
+    _snapshot_build_state['started_at'] = now
+    threading.Thread(target=run_snapshot_build, args=(now,), daemon=True).start()
+
+def open_snapshot() -> Optional[Dict[str, Any]]:
+    try:
+        stat = os.stat(SNAPSHOT_PATH)
+    except OSError:
+        return None
+    
+    cached = _snapshot_cache.get('snapshot')
+    if cached and cached['ino'] == stat.st_ino and cached['mtime_ns'] == stat.st_mtime_ns:
+        return cached
+    
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, built_at, version = SNAPSHOT_HEADER.unpack_from(mm, 0)
+    except (OSError, ValueError, struct.error):
+        return None
+    
+    if magic != SNAPSHOT_MAGIC:
+        mm.close()
+        return None
+    
+    if cached:
+        cached['mm'].close()
+    snapshot = {
+        'mm': mm, 'count': count, 'built_at': built_at, 'version': version,
+        'checked_at': 0.0, 'outdated': False, 'ino': stat.st_ino, 'mtime_ns': stat.st_mtime_ns
+    }
+    _snapshot_cache['snapshot'] = snapshot
+    return snapshot
+
+def snapshot_lookup(snapshot: Dict[str, Any], cert_id: str) -> Optional[tuple]:
+    mm = snapshot['mm']
+    key = cert_id.encode('utf-8')
+    lo, hi = 0, snapshot['count']
+    
+    while lo < hi:
+        mid = (lo + hi) // 2
+        offset = SNAPSHOT_OFFSET.unpack_from(mm, SNAPSHOT_HEADER.size + mid * SNAPSHOT_OFFSET.size)[0]
+        id_len, owner_len, url_len, status_len, valid_from, valid_until, created_at = SNAPSHOT_RECORD.unpack_from(mm, offset)
+        start = offset + SNAPSHOT_RECORD.size
+        current = mm[start:start + id_len]
+        
+        if current < key:
+            lo = mid + 1
+        elif current > key:
+            hi = mid
+        else:
+            start += id_len
+            owner_name = mm[start:start + owner_len].decode('utf-8')
+            start += owner_len
+            certificate_url = mm[start:start + url_len].decode('utf-8')
+            start += url_len
+            status = mm[start:start + status_len].decode('utf-8') or None
+            return (
+                cert_id,
+                owner_name,
+                certificate_url,
+                status,
+                date.fromordinal(valid_from) if valid_from else None,
+                date.fromordinal(valid_until) if valid_until else None,
+                SNAPSHOT_EPOCH + timedelta(microseconds=created_at) if created_at != SNAPSHOT_NULL_TIMESTAMP else None
+            )
+    return None
+
+def fetch_certificate_row(cert_id: str) -> Optional[tuple]:
+    conn = get_db_connection(readonly=True)
+    cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    cur.execute(f"SELECT {CERT_COLUMNS} FROM certificates WHERE id = %s", (cert_id,))
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    return row
+
+def snapshot_is_current(snapshot: Dict[str, Any]) -> bool:
+    now = time.time()
+    if now - snapshot['built_at'] > SNAPSHOT_MAX_AGE:
+        return False
+    
+    # Версия данных проверяется не чаще раза в SNAPSHOT_VERSION_TTL секунд: отзыв или удаление
+    # сертификата видны в ответах не позже чем через этот интервал. Сверяем с основной БД, чтобы не зависеть от отставания реплики
+    if not snapshot['outdated'] and now - snapshot['checked_at'] > SNAPSHOT_VERSION_TTL:
+        try:
+            conn = get_db_connection()
+            try:
+                version = fetch_data_version(conn.cursor(cursor_factory=psycopg2.extensions.cursor))
+            finally:
+                conn.close()
+        except psycopg2.OperationalError:
+            return False
+        snapshot['checked_at'] = now
+        snapshot['outdated'] = version > snapshot['version']
+    return not snapshot['outdated']
+
+def lookup_certificate_row(cert_id: str) -> Optional[tuple]:
+    snapshot = open_snapshot() if SNAPSHOT_MAX_AGE > 0 else None
+    if snapshot is not None and snapshot_is_current(snapshot):
+        row = snapshot_lookup(snapshot, cert_id)
+        if row:
+            return row
+    elif SNAPSHOT_MAX_AGE > 0:
+        schedule_snapshot_build()
+    
+    # Промах по снимку (ID мог появиться после сборки) или снимок неактуален
+    try:
+        return fetch_certificate_row(cert_id)
+    except psycopg2.OperationalError:
+        # БД недоступна: отвечаем по снимку, если он не старше SNAPSHOT_OUTAGE_MAX_AGE
+        if snapshot is not None and time.time() - snapshot['built_at'] <= SNAPSHOT_OUTAGE_MAX_AGE:
+            row = snapshot_lookup(snapshot, cert_id)
+            if row:
+                return row
+        raise
+
+def search_certificate(cert_id: str, use_primary: bool = False) -> Optional[Dict[str, Any]]:
+    if not use_primary:
+        row = lookup_certificate_row(cert_id)
+        return dict(zip(CERT_KEYS, row)) if row else None
+    
     conn = get_db_connection()
     cur = conn.cursor()
     cur.execute("SELECT id, owner_name, certificate_url, status, valid_from, valid_until FROM certificates WHERE id = %s", (cert_id,))
@@ -100,6 +350,49 @@ def search_certificate(cert_id: str) -> Optional[Dict[str, Any]]:
     conn.close()
     return dict(cert) if cert else None
 
+def normalize_owner_query(query: str) -> str:
+    return query.strip().lower().replace('ё', 'е')
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_certificates_by_owner(query: str, limit: int) -> List[Dict[str, Any]]:
+    # Ступени по убыванию точности; следующая выполняется, только если предыдущие не набрали limit:
+    # 1) имя начинается с запроса (btree), 2) подстрока (GIN pg_trgm) с ранжированием среди первых SEARCH_CANDIDATES совпадений,
+    # 3) нечеткое совпадение по словам (<%) - только если ничего не найдено: оно дороже и на коротких запросах не укладывается в миллисекунды
+    normalized = normalize_owner_query(query)
+    pattern = escape_like(normalized)
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(
+        'SELECT id, owner_name, status FROM certificates WHERE owner_name_norm COLLATE "C" LIKE %s '
+        'ORDER BY owner_name_norm COLLATE "C", id LIMIT %s',
+        (f'{pattern}%', limit)
+    )
+    rows = cur.fetchall()
+    
+    if len(rows) < limit:
+        cur.execute(
+            "SELECT id, owner_name, status FROM ("
+            "SELECT id, owner_name, status, owner_name_norm FROM certificates "
+            "WHERE owner_name_norm LIKE %s AND owner_name_norm NOT LIKE %s LIMIT %s"
+            ") AS candidates ORDER BY word_similarity(%s, owner_name_norm) DESC, owner_name, id LIMIT %s",
+            (f'%{pattern}%', f'{pattern}%', SEARCH_CANDIDATES, normalized, limit - len(rows))
+        )
+        rows += cur.fetchall()
+    
+    if not rows and len(normalized) >= SEARCH_FUZZY_MIN_LENGTH:
+        cur.execute(
+            "SELECT id, owner_name, status FROM certificates WHERE %s <%% owner_name_norm "
+            "ORDER BY word_similarity(%s, owner_name_norm) DESC, owner_name, id LIMIT %s",
+            (normalized, normalized, limit)
+        )
+        rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return [dict(c) for c in rows]
+
+# Экраны админки читают с основной БД: админ попадает на них сразу после записи, реплика может отставать
 def get_all_certificates() -> List[Dict[str, Any]]:
     conn = get_db_connection()
     cur = conn.cursor()
@@ -206,7 +499,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 # Детали конкретного сертификата
                 elif callback_data.startswith('cert_'):
                     cert_id = callback_data.replace('cert_', '')
-                    cert = search_certificate(cert_id)
+                    cert = search_certificate(cert_id, use_primary=True)
                     
                     if cert:
                         status_emoji = "✅" if cert['status'] == 'valid' else "❌"
@@ -249,8 +542,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     
                     if update_certificate_status(cert_id, new_status):
                         answer_callback_query(callback_id, '✅ Статус обновлен')
-                        # Обновляем сообщение
-                        cert = search_certificate(cert_id)
+                        # Обновляем сообщение (читаем с основной БД, реплика может отставать)
+                        cert = search_certificate(cert_id, use_primary=True)
                         status_emoji = "✅" if cert['status'] == 'valid' else "❌"
                         status_text = "Действительно" if cert['status'] == 'valid' else "Недействительно"
                         
@@ -329,9 +622,39 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     }
                     send_telegram_message(chat_id, menu_text, reply_markup=keyboard)
             
+            # Команда /find <имя> - поиск по владельцу
+            elif text == '/find' or text.startswith('/find '):
+                if not is_admin(username):
+                    send_telegram_message(chat_id, "❌ <b>Доступ запрещен</b>\n\nПоиск доступен только для @skzry")
+                else:
+                    query = text[len('/find'):].strip()
+                    if len(query) < SEARCH_MIN_LENGTH:
+                        send_telegram_message(chat_id, f"🔎 Использование: <code>/find Петрова</code>\n\nМинимум {SEARCH_MIN_LENGTH} символа")
+                    else:
+                        # Лишняя строка показывает, что совпадений больше лимита
+                        certs = search_certificates_by_owner(query, SEARCH_LIMIT + 1)
+                        has_more = len(certs) > SEARCH_LIMIT
+                        certs = certs[:SEARCH_LIMIT]
+                        if not certs:
+                            send_telegram_message(chat_id, f"🔎 По запросу <b>{html.escape(query)}</b> ничего не найдено")
+                        else:
+                            buttons = []
+                            for cert in certs:
+                                status_emoji = "✅" if cert['status'] == 'valid' else "❌"
+                                buttons.append([{'text': f"{status_emoji} {cert['id']} — {cert['owner_name']}", 'callback_data': f"cert_{cert['id']}"}])
+                            
+                            result_text = f"🔎 <b>Поиск:</b> {html.escape(query)}\n\nНайдено: {len(certs)}{'+' if has_more else ''}"
+                            if has_more:
+                                result_text += f" (показаны первые {SEARCH_LIMIT})"
+                            send_telegram_message(chat_id, result_text, reply_markup={'inline_keyboard': buttons})
+            
             # Поиск по ID
             elif text:
-                cert = search_certificate(text.upper())
+                try:
+                    cert = search_certificate(text.upper())
+                except psycopg2.OperationalError:
+                    send_telegram_message(chat_id, "⚠️ Проверка временно недоступна, попробуйте позже")
+                    return {'statusCode': 200, 'headers': headers, 'body': json.dumps({'ok': True}), 'isBase64Encoded': False}
                 
                 if cert:
                     status_emoji = "✅" if cert.get('status') == 'valid' else "❌"
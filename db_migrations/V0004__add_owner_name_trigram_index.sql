@@ -0,0 +1,4 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_certificates_owner_name_trgm
+    ON certificates USING gin (lower(translate(owner_name, 'Ёё', 'Ее')) gin_trgm_ops);
@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS certificates_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO certificates_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_certificates_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE certificates_version SET version = version + 1 WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_certificates_version ON certificates;
+
+CREATE TRIGGER trg_certificates_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON certificates
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_certificates_version();
@@ -0,0 +1,10 @@
+ALTER TABLE certificates
+ADD COLUMN IF NOT EXISTS owner_name_norm TEXT GENERATED ALWAYS AS (lower(translate(owner_name, 'Ёё', 'Ее'))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_certificates_owner_name_norm_prefix
+    ON certificates ((owner_name_norm COLLATE "C"), id);
+
+CREATE INDEX IF NOT EXISTS idx_certificates_owner_name_norm_trgm
+    ON certificates USING gin (owner_name_norm gin_trgm_ops);
+
+DROP INDEX IF EXISTS idx_certificates_owner_name_trgm;
@@ -0,0 +1,16 @@
+-- Одна строка счетчика блокировалась каждой записью в certificates до конца транзакции.
+-- Счетчик делится на 16 строк: транзакция увеличивает строку своего процесса, версия - сумма всех строк.
+ALTER TABLE certificates_version DROP CONSTRAINT IF EXISTS certificates_version_id_check;
+
+ALTER TABLE certificates_version ALTER COLUMN id DROP DEFAULT;
+
+INSERT INTO certificates_version (id, version)
+SELECT shard, 0 FROM generate_series(0, 15) AS shard
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_certificates_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE certificates_version SET version = version + 1 WHERE id = pg_backend_pid() % 16;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
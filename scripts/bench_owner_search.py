@@ -0,0 +1,112 @@
+'''
+Business: Бенчмарк поиска по имени владельца (GET /certificates?q=) на засеянной таблице
+Args: DATABASE_URL - БД с примененными db_migrations; --rows - число строк (по умолчанию 300000); --keep - не удалять засеянные строки
+Returns: время search_by_owner_name (лучшее из 5) и EXPLAIN ANALYZE каждого запроса, который он выполняет
+'''
+
+import argparse
+import importlib.util
+import io
+import os
+import random
+import sys
+import time
+
+import psycopg2
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'certificates', 'index.py')
+SEED_PREFIX = 'BENCH-'
+QUERIES = ['ова', 'Петров', 'мария', 'Петрова Мария', 'Иванова Е', 'Сидоренко', 'Ивонова Мария']
+
+SURNAMES = [
+    'Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Соколов', 'Михайлов', 'Новиков',
+    'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов', 'Егоров', 'Павлов', 'Козлов', 'Степанов',
+    'Николаев', 'Орлов', 'Андреев', 'Макаров', 'Никитин', 'Захаров', 'Зайцев', 'Соловьёв', 'Борисов', 'Яковлев',
+    'Григорьев', 'Романов', 'Воробьёв', 'Сергеев', 'Кузьмин', 'Фролов', 'Александров', 'Дмитриев', 'Королёв', 'Гусев',
+    'Киселёв', 'Ильин', 'Максимов', 'Поляков', 'Сорокин', 'Виноградов', 'Ковалёв', 'Белов', 'Медведев', 'Антонов',
+    'Сидоренко', 'Шевченко', 'Бондаренко', 'Коваленко', 'Ткаченко', 'Кравченко', 'Олейник', 'Мельник', 'Руденко'
+]
+MALE_NAMES = ['Иван', 'Пётр', 'Алексей', 'Сергей', 'Дмитрий', 'Андрей', 'Михаил', 'Николай', 'Александр', 'Владимир']
+FEMALE_NAMES = ['Мария', 'Анна', 'Елена', 'Ольга', 'Татьяна', 'Наталья', 'Ирина', 'Светлана', 'Екатерина', 'Алёна']
+PATRONYMICS = ['Иванович', 'Петрович', 'Сергеевич', 'Алексеевич', 'Дмитриевич', 'Андреевич', 'Михайлович', 'Николаевич']
+
+def load_certificates_module():
+    spec = importlib.util.spec_from_file_location('certificates_index', INDEX_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_name(rnd: random.Random) -> str:
+    surname = rnd.choice(SURNAMES)
+    if rnd.random() < 0.5:
+        return f'{surname} {rnd.choice(MALE_NAMES)} {rnd.choice(PATRONYMICS)}'
+    if surname.endswith(('ов', 'ев', 'ёв', 'ин')):
+        surname += 'а'
+    return f'{surname} {rnd.choice(FEMALE_NAMES)} {rnd.choice(PATRONYMICS)[:-2]}на'
+
+def seed(conn, count: int) -> None:
+    rnd = random.Random(1)
+    buf = io.StringIO()
+    for i in range(count):
+        buf.write(f'{SEED_PREFIX}{i:07d}\t{make_name(rnd)}\thttps://example.com/cert/{i}\n')
+    buf.seek(0)
+    cur = conn.cursor()
+    cur.copy_from(buf, 'certificates', columns=('id', 'owner_name', 'certificate_url'))
+    conn.commit()
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE certificates")
+    conn.autocommit = False
+    cur.close()
+
+class ExplainingCursor:
+    '''Перед каждым запросом печатает его EXPLAIN ANALYZE, затем выполняет сам запрос'''
+    
+    def __init__(self, cur):
+        self.cur = cur
+    
+    def execute(self, query, params):
+        self.cur.execute('EXPLAIN (ANALYZE, BUFFERS) ' + query, params)
+        print('\n'.join(row[0] for row in self.cur.fetchall()))
+        print()
+        self.cur.execute(query, params)
+    
+    def fetchall(self):
+        return self.cur.fetchall()
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=300000)
+    parser.add_argument('--keep', action='store_true')
+    args = parser.parse_args()
+    
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        sys.exit('Задайте DATABASE_URL')
+    
+    index = load_certificates_module()
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    cur.execute("SELECT count(*) FROM certificates WHERE id LIKE %s", (f'{SEED_PREFIX}%',))
+    if cur.fetchone()[0] == 0:
+        seed(conn, args.rows)
+    cur.execute("SELECT count(*) FROM certificates")
+    print(f'rows={cur.fetchone()[0]}')
+    
+    try:
+        for query in QUERIES:
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                rows = index.search_by_owner_name(cur, query, index.SEARCH_DEFAULT_LIMIT)
+                timings.append(time.perf_counter() - started)
+            print(f'=== q={query!r}: {min(timings) * 1000:.1f} ms, {len(rows)} rows, first={rows[0][1] if rows else None}')
+            index.search_by_owner_name(ExplainingCursor(cur), query, index.SEARCH_DEFAULT_LIMIT)
+    finally:
+        conn.rollback()
+        if not args.keep:
+            cur.execute("DELETE FROM certificates WHERE id LIKE %s", (f'{SEED_PREFIX}%',))
+            conn.commit()
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+'''
+Business: Микро-бенчмарк сериализации списка сертификатов (GET /certificates)
+Args: --rows - число строк (по умолчанию 50000), --repeat - число повторов
+Returns: время старой сериализации (RealDictRow + json.dumps(default=str)) и новой (кортежи + json_response)
+'''
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import timeit
+from datetime import date, datetime
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'certificates', 'index.py')
+CERT_KEYS = ('id', 'owner_name', 'certificate_url', 'status', 'valid_from', 'valid_until', 'created_at')
+
+def load_certificates_module():
+    spec = importlib.util.spec_from_file_location('certificates_index', INDEX_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_rows(count: int) -> list:
+    return [
+        (
+            f'CERT-2024-{i:06d}',
+            'Петрова Мария Сергеевна',
+            f'https://example.com/cert/{i}',
+            'valid' if i % 4 else 'invalid',
+            date(2024, 1, 1),
+            date(2025, 1, 1) if i % 3 else None,
+            datetime(2024, 5, 1, 12, 30, 1, i % 1000000)
+        )
+        for i in range(count)
+    ]
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    index = load_certificates_module()
+    rows = make_rows(args.rows)
+    # Старый путь получал RealDictRow; dict(zip(...)) - нижняя оценка его стоимости
+    dict_rows = [dict(zip(CERT_KEYS, row)) for row in rows]
+    
+    def before():
+        return json.dumps({'certificates': [dict(row) for row in dict_rows]}, default=str)
+    
+    def after():
+        return index.json_response(200, {'certificates': index.serialize_certificates(rows)}, {}, {})
+    
+    def after_gzip():
+        return index.json_response(200, {'certificates': index.serialize_certificates(rows)}, {}, {'Accept-Encoding': 'gzip'})
+    
+    if json.loads(after()['body']) != json.loads(before()):
+        sys.exit('Результаты сериализации не совпадают')
+    
+    print(f"rows={args.rows} orjson={'yes' if index.orjson else 'no'} brotli={'yes' if index.brotli else 'no'}")
+    for name, func in (('before', before), ('after', after), ('after+gzip', after_gzip)):
+        seconds = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f'{name:<12} {seconds * 1000:8.1f} ms')
+    print(f"{'body bytes':<12} {len(before().encode('utf-8')):>8} -> {len(after_gzip()['body'])} (gzip, base64)")
+
+if __name__ == '__main__':
+    main()
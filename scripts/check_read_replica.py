@@ -0,0 +1,79 @@
+'''
+Business: Проверка маршрутизации чтения на реплику (DATABASE_READ_URL) на двух локальных Postgres
+Args: переменные окружения DATABASE_URL и DATABASE_READ_URL - две независимые БД с примененными db_migrations
+Returns: код выхода 0, если чтения идут на реплику, записи и экраны админки - на основную БД, а при недоступной реплике срабатывает fallback
+'''
+
+import importlib.util
+import os
+import socket
+import sys
+import time
+import uuid
+
+import psycopg2
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+def load_function(name: str):
+    spec = importlib.util.spec_from_file_location(f'{name}_index', os.path.join(ROOT, 'backend', name, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def check(condition: bool, message: str) -> None:
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        sys.exit(1)
+
+def main() -> None:
+    primary_url = os.environ.get('DATABASE_URL')
+    read_url = os.environ.get('DATABASE_READ_URL')
+    if not primary_url or not read_url:
+        sys.exit('Задайте DATABASE_URL и DATABASE_READ_URL')
+    
+    # Снимок отключен, чтобы каждый поиск по ID шел в БД
+    os.environ['CERT_SNAPSHOT_MAX_AGE'] = '0'
+    
+    # Сертификат-маркер есть только в "реплике": так видно, из какой БД пришел ответ
+    marker_id = f'REPLICA-CHECK-{uuid.uuid4().hex[:8].upper()}'
+    replica = psycopg2.connect(read_url)
+    replica.autocommit = True
+    replica.cursor().execute(
+        "INSERT INTO certificates (id, owner_name, certificate_url) VALUES (%s, %s, %s)",
+        (marker_id, 'Проверка Реплики', 'https://example.com/replica-check')
+    )
+    
+    try:
+        certificates = load_function('certificates')
+        bot = load_function('telegram-bot')
+        
+        response = certificates.handler({'httpMethod': 'GET', 'queryStringParameters': {'id': marker_id}}, None)
+        check(response['statusCode'] == 200, 'GET /certificates?id= читает с реплики')
+        check(bot.search_certificate(marker_id) is not None, 'search_certificate в боте читает с реплики')
+        check(bot.search_certificate(marker_id, use_primary=True) is None, 'карточка админки читает с основной БД')
+        check(all(cert['id'] != marker_id for cert in bot.get_all_certificates()), 'список в админке читает с основной БД')
+        
+        # Порт принимает TCP-соединения, но не отвечает: подключение к "реплике" ждет connect_timeout
+        blackhole = socket.socket()
+        blackhole.bind(('127.0.0.1', 0))
+        blackhole.listen(16)
+        os.environ['DATABASE_READ_URL'] = f'postgresql://postgres@127.0.0.1:{blackhole.getsockname()[1]}/postgres'
+        certificates = load_function('certificates')
+        
+        started = time.time()
+        response = certificates.handler({'httpMethod': 'GET', 'queryStringParameters': {'id': marker_id}}, None)
+        first = time.time() - started
+        check(response['statusCode'] == 404, f'недоступная реплика: чтение ушло на основную БД ({first:.2f} с)')
+        
+        started = time.time()
+        certificates.handler({'httpMethod': 'GET', 'queryStringParameters': {'id': marker_id}}, None)
+        second = time.time() - started
+        check(second < certificates.REPLICA_CONNECT_TIMEOUT, f'повторное чтение не ждет таймаут реплики ({second:.2f} с)')
+        blackhole.close()
+    finally:
+        replica.cursor().execute("DELETE FROM certificates WHERE id = %s", (marker_id,))
+        replica.close()
+
+if __name__ == '__main__':
+    main()